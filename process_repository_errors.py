@@ -5,123 +5,238 @@ problematic resources with URLs.
 
 The script prints the results to the console for manual copy/paste into email.
 
-Requires (env):
+Usage:
+    python process_repository_errors.py [--dates YYYY-MM-DD [YYYY-MM-DD ...]]
+        [--log-filename NAME] [--host HOST]
+
+Several dates are checked over one SSH command and get one email draft each.
+
+Requires (env, unless --host is given):
 - EAD_SSH_HOST
 - OR EAD_SERVER
+
+Authentication uses the SSH agent or keys from ~/.ssh; nothing is prompted,
+so the script can run unattended (e.g. from cron).
 """
 
 import paramiko
+import argparse
+import concurrent.futures
 import datetime
+import functools
+import multiprocessing
 import os
 import re
+import shlex
+
+# Resource URI as it appears in the exporter log
+_URI_RE = re.compile(rb"/repositories/(\d+)/resources/(\d+)")
+
+# Error messages worth reporting; the remote filter is built from this list,
+# so it is the one place to add or remove a token
+_ERROR_TOKENS = ("SolrIndexerError", "XML cleaning failed", "Validation error")
+
+# Marker line the remote command prints before each date's output
+_SECTION_RE = re.compile(rb"^==DATE:(\d{4}-\d{2}-\d{2})==\n?", re.MULTILINE)
+
+# Date embedded in an exporter log filename
+_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+# How much to pull off the SSH channel per recv()
+_READ_SIZE = 65536
 
-# SSH Configuration
-host = os.getenv("EAD_SSH_HOST") or os.getenv("EAD_SERVER")
-if not host:
-    print("Error: set EAD_SSH_HOST (recommended) or EAD_SERVER.")
-    exit()
-
-# Read ~/.ssh/config
-cfg = paramiko.SSHConfig()
-cfg_path = os.path.expanduser("~/.ssh/config")
-ssh_params = {"hostname": host}
-if os.path.exists(cfg_path):
+# Output past this many bytes is parsed in batches of this size across CPU
+# cores (about half a million distinct URIs, so in practice rarely)
+_BATCH_SIZE = 16 * 1024 * 1024
+
+# SSH flow control for channels opened on our transports; paramiko's
+# defaults cap a single channel well below what the link can carry
+_WINDOW_SIZE = 2**27
+_MAX_PACKET_SIZE = 2**19
+
+
+def _iter_chunks(channel, size=_READ_SIZE):
+    """Yield the channel's output in blocks that end on a line boundary."""
+    pending = b""
+    while True:
+        data = channel.recv(size)
+        if not data:
+            break
+        block, _, pending = (pending + data).rpartition(b"\n")
+        if block:
+            yield block
+    if pending:
+        yield pending
+
+
+def _find_resources(block):
+    """Yield the (repository, resource) ID pairs found in block."""
+    for match in _URI_RE.finditer(block):
+        yield int(match.group(1)), int(match.group(2))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_ssh_config(cfg_path, mtime):
+    """Parse the SSH config at cfg_path; mtime keys the cache so edits are seen."""
+    cfg = paramiko.SSHConfig()
     with open(cfg_path) as f:
         cfg.parse(f)
-    hc = cfg.lookup(host)
-    if "hostname" in hc: ssh_params["hostname"] = hc["hostname"]
-    if "user" in hc:     ssh_params["username"] = hc["user"]
-    if "port" in hc:     ssh_params["port"] = int(hc["port"])
-    if "identityfile" in hc: ssh_params["key_filename"] = hc["identityfile"]
-
-# Generate today's date for log filename and email subject
-today_date = datetime.date.today()
-formatted_date = today_date.strftime("%A %B %d, %Y")
-default_log_filename = f"exporter_app.out-{today_date.strftime('%Y-%m-%d')}"
-
-# Ask user for export log file (defaults to current date)
-user_input = input(f"\nEnter the export log filename (default: {default_log_filename}): ").strip()
-log_filename = user_input if user_input else default_log_filename
-
-# Extract date from log filename to determine date range
-date_match = re.search(r"(\d{4}-\d{2}-\d{2})", log_filename)
-if date_match:
-    log_date = date_match.group(1)
-    log_datetime = datetime.datetime.strptime(log_date, "%Y-%m-%d").date()
-    yesterday = (log_datetime - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-    today = log_date
-else:
-    print("Error: Could not determine date from filename. Using default date range.")
-    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-    today = today_date.strftime("%Y-%m-%d")
-
-# Define a broader grep command to get all early-morning logs
-log_path = f"/usr/local/src/archivesspace_export_service/exporter_app/logs/{log_filename}"
-grep_command = f'grep -E "{yesterday}|{today}T0[0-6]" {log_path}'
-
-# Start SSH connection
-try:
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(allow_agent=True, look_for_keys=True, timeout=20, **ssh_params)
-
-    stdin, stdout, stderr = ssh.exec_command(grep_command)
-
-    output = stdout.read().decode().strip()
-    errors = stderr.read().decode().strip()
-
-    if errors:
-        print(f"Error executing grep command: {errors}")
-
-    print("\n===== Retrieved Repository Errors =====")
-    if not output:
-        print("No repository errors found.")
-        exit()
+    return cfg
+
+
+@functools.lru_cache(maxsize=None)
+def _lookup_ssh_config(cfg_path, mtime, host):
+    """Return the SSH config options that apply to host."""
+    return _load_ssh_config(cfg_path, mtime).lookup(host)
+
+
+def _parse_sections(buf):
+    """Split buf on date markers into [(date, pairs), ...], in order.
+
+    The first entry's date is None: it holds whatever precedes the first
+    marker, which belongs to the previous buffer's last section.
+    """
+    # split() alternates section text with the date of the next marker
+    text, *rest = _SECTION_RE.split(buf)
+    sections = [(None, set(_find_resources(text)))]
+    for marker, text in zip(rest[::2], rest[1::2]):
+        sections.append((marker.decode(), set(_find_resources(text))))
+    return sections
+
+
+def _iter_batches(blocks, size=_BATCH_SIZE):
+    """Group line-aligned blocks into batches of about size bytes."""
+    batch, total = [], 0
+    for block in blocks:
+        batch.append(block)
+        total += len(block)
+        if total >= size:
+            yield b"\n".join(batch)
+            batch, total = [], 0
+    if batch:
+        yield b"\n".join(batch)
+
+
+def _parse_output(channel):
+    """Yield the (date, pairs) sections of the channel's output, in order.
+
+    Blocks are parsed here as they arrive. Only once more than _BATCH_SIZE
+    bytes have come in is the rest grouped into batches for a process pool.
+    """
+    blocks = _iter_chunks(channel)
+    total = 0
+    for block in blocks:
+        yield from _parse_sections(block)
+        total += len(block)
+        if total >= _BATCH_SIZE:
+            break
+    else:
+        return
+
+    # spawn rather than fork: paramiko's transport thread is still running
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(mp_context=context) as pool:
+        futures = [pool.submit(_parse_sections, batch) for batch in _iter_batches(blocks, _BATCH_SIZE)]
+        for future in futures:
+            yield from future.result()
+
+
+def _collect_resources(channel, dates):
+    """Return {date: set of (repository, resource) pairs} for the given dates."""
+    sections = {date: set() for date in dates}
+    seen = None
+    for marker, pairs in _parse_output(channel):
+        # Unmarked text continues the previous section
+        if marker is not None:
+            seen = sections[marker]
+        if seen is not None:
+            seen.update(pairs)
+    return sections
+
+
+def _ssh_params(host):
+    """Build SSHClient.connect() arguments for host from ~/.ssh/config."""
+    cfg_path = os.path.expanduser("~/.ssh/config")
+    ssh_params = {"hostname": host}
+    if os.path.exists(cfg_path):
+        hc = _lookup_ssh_config(cfg_path, os.path.getmtime(cfg_path), host)
+        if "hostname" in hc: ssh_params["hostname"] = hc["hostname"]
+        if "user" in hc:     ssh_params["username"] = hc["user"]
+        if "port" in hc:     ssh_params["port"] = int(hc["port"])
+        if "identityfile" in hc: ssh_params["key_filename"] = hc["identityfile"]
+    return ssh_params
 
-except Exception as e:
-    print(f"SSH Connection Failed: {e}")
-    exit()
-
-finally:
-    ssh.close()
-
-# Process the repository errors
-resources = []
-last_repo = None
-last_resource = None
-
-for line in output.splitlines():
-    # Look for resource URI lines
-    uri_match = re.search(r"/repositories/(\d+)/resources/(\d+)", line)
-    if uri_match:
-        last_repo = int(uri_match.group(1))
-        last_resource = int(uri_match.group(2))
-
-    # Match error lines of interest
-    if "ERROR" in line and (
-        "XML cleaning failed" in line
-        or "SolrIndexerError" in line
-        or "Validation error" in line
-    ):
-        if last_repo is not None and last_resource is not None:
-            resources.append({
-                "RepositoryID": last_repo,
-                "ResourceID": last_resource
-            })
-            # Clear after logging to avoid duplicates
-            last_repo = None
-            last_resource = None
-
-# Remove duplicates
-resources = [dict(t) for t in {tuple(d.items()) for d in resources}]
-
-if not resources:
-    print("No repository errors found.")
-    exit()
-
-# Generate the email text
-email_subject = f"ArchivesSpace Validation Errors :: {formatted_date}"
-email_body = """Hello!
+
+# Open SSH clients by host, so repeated commands share one transport
+_clients = {}
+
+
+def get_client(host):
+    """Return a connected SSHClient for host, reusing a live cached one."""
+    ssh = _clients.get(host)
+    transport = ssh.get_transport() if ssh else None
+    if transport is None or not transport.is_active():
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect(allow_agent=True, look_for_keys=True, timeout=20, **_ssh_params(host))
+        transport = ssh.get_transport()
+        transport.default_window_size = _WINDOW_SIZE
+        transport.default_max_packet_size = _MAX_PACKET_SIZE
+        _clients[host] = ssh
+    return ssh
+
+
+def close_clients():
+    """Close every cached SSH client."""
+    while _clients:
+        _clients.popitem()[1].close()
+
+
+def _log_command(log_filename, run_date):
+    """Return the remote pipeline printing the distinct errored URIs in a log."""
+    # Extract date from log filename to determine date range
+    date_match = _DATE_RE.search(log_filename)
+    if date_match:
+        log_date = date_match.group(1)
+        log_datetime = datetime.datetime.strptime(log_date, "%Y-%m-%d").date()
+        yesterday = (log_datetime - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        today = log_date
+    else:
+        print("Error: Could not determine date from filename. Using default date range.")
+        yesterday = (run_date - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        today = run_date.strftime("%Y-%m-%d")
+
+    # Filter the early-morning logs on the server: keep the error lines of
+    # interest, print the first resource URI on each, then dedupe there too, so
+    # only the distinct errored URIs are sent back. Every filter but the URI is
+    # a fixed-string grep, which matches all of its strings in one pass.
+    log_path = shlex.quote(f"/usr/local/src/archivesspace_export_service/exporter_app/logs/{log_filename}")
+    date_patterns = [yesterday] + [f"{today}T0{hour}" for hour in range(7)]
+    date_args = " ".join(f"-e {pattern}" for pattern in date_patterns)
+    token_args = " ".join(f"-e {shlex.quote(token)}" for token in _ERROR_TOKENS)
+    awk_program = (
+        'match($0, "/repositories/[0-9]+/resources/[0-9]+")'
+        " { print substr($0, RSTART, RLENGTH) }"
+    )
+    return (
+        f"LC_ALL=C grep -F {date_args} {log_path}"
+        " | LC_ALL=C grep -F ERROR"
+        f" | LC_ALL=C grep -F {token_args}"
+        f" | LC_ALL=C awk '{awk_program}'"
+        " | LC_ALL=C sort -u"
+    )
+
+
+def print_email(run_date, seen):
+    """Print the email draft listing the errored resources for run_date."""
+    formatted_date = run_date.strftime("%A %B %d, %Y")
+    if not seen:
+        print(f"\nNo repository errors found for {formatted_date}.")
+        return
+
+    # Generate the email text
+    email_subject = f"ArchivesSpace Validation Errors :: {formatted_date}"
+    email_body = """Hello!
 
 Below you'll find a list of collections that encountered errors this morning during the export process. These errors were reported by the application that exports EAD to a Yale ArchivesSpace GitHub repository and generates the public-facing PDF finding aids.
 
@@ -132,16 +247,94 @@ All best,
 
 """
 
-# Append errored resources
-for resource in resources:
-    repository_id = resource["RepositoryID"]
-    resource_id = resource["ResourceID"]
-    resource_url = f"https://archives.yale.edu/repositories/{repository_id}/resources/{resource_id}"
-    email_body += f"{resource_url}\n"
-
-# Print the email draft
-print("\n===== Email Preview =====")
-print(email_subject)
-print(email_body)
-print("\n---")
-print()
\ No newline at end of file
+    # Append errored resources
+    email_body += "".join(
+        f"https://archives.yale.edu/repositories/{repository_id}/resources/{resource_id}\n"
+        for repository_id, resource_id in sorted(seen)
+    )
+
+    # Print the email draft
+    print("\n===== Email Preview =====")
+    print(email_subject)
+    print(email_body)
+    print("\n---")
+    print()
+
+
+def main():
+    # Command-line options
+    parser = argparse.ArgumentParser(
+        description="Print an email listing resources with EAD export errors."
+    )
+    parser.add_argument(
+        "--date",
+        "--dates",
+        dest="dates",
+        nargs="+",
+        type=datetime.date.fromisoformat,
+        default=[datetime.date.today()],
+        help="date(s) of the export run, YYYY-MM-DD (default: today)",
+    )
+    parser.add_argument(
+        "--log-filename",
+        help="export log filename (default: exporter_app.out-<date>)",
+    )
+    parser.add_argument(
+        "--host",
+        default=os.getenv("EAD_SSH_HOST") or os.getenv("EAD_SERVER"),
+        help="SSH host of the exporter server (default: $EAD_SSH_HOST or $EAD_SERVER)",
+    )
+    args = parser.parse_args()
+    # Each date is checked once, in the order given
+    args.dates = list(dict.fromkeys(args.dates))
+    if args.log_filename and len(args.dates) > 1:
+        parser.error("--log-filename can only be used with a single date")
+
+    # SSH Configuration
+    host = args.host
+    if not host:
+        print("Error: set EAD_SSH_HOST (recommended) or EAD_SERVER, or pass --host.")
+        exit()
+
+    # One remote command covers every requested date; each date's output is
+    # introduced by a marker line so it can be split apart again here
+    commands = []
+    for run_date in args.dates:
+        log_filename = args.log_filename or f"exporter_app.out-{run_date.strftime('%Y-%m-%d')}"
+        commands.append(f"echo ==DATE:{run_date.isoformat()}==; {_log_command(log_filename, run_date)}")
+    grep_command = "; ".join(commands)
+
+    # Start SSH connection
+    try:
+        ssh = get_client(host)
+
+        stdin, stdout, stderr = ssh.exec_command(grep_command)
+
+        # Collect (repository, resource) pairs per date; the sets drop duplicates
+        # as we go
+        sections = _collect_resources(stdout.channel, [run_date.isoformat() for run_date in args.dates])
+
+        errors = stderr.read().decode(errors="replace").strip()
+
+        if errors:
+            print(f"Error executing grep command: {errors}")
+
+        print("\n===== Retrieved Repository Errors =====")
+
+    except Exception as e:
+        print(f"SSH Connection Failed: {e}")
+        exit()
+
+    finally:
+        close_clients()
+
+    if not any(sections.values()):
+        print("No repository errors found.")
+        exit()
+
+    for run_date in args.dates:
+        print_email(run_date, sections[run_date.isoformat()])
+
+
+if __name__ == "__main__":
+    main()
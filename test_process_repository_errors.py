@@ -0,0 +1,85 @@
+"""
+Tests for the output parsing in process_repository_errors.
+
+Run with: python -m unittest
+"""
+
+import unittest
+from unittest import mock
+
+import process_repository_errors as pre
+
+
+class FakeChannel:
+    """Stands in for a paramiko channel, returning data in fixed-size pieces."""
+
+    def __init__(self, data, piece=7):
+        self.data = data
+        self.piece = piece
+
+    def recv(self, size):
+        chunk, self.data = self.data[:self.piece], self.data[self.piece:]
+        return chunk
+
+
+OUTPUT = (
+    b"==DATE:2025-01-02==\n"
+    b"/repositories/2/resources/100\n"
+    b"/repositories/4/resources/300\n"
+    b"==DATE:2025-01-03==\n"
+    b"==DATE:2025-01-04==\n"
+    b"/repositories/9/resources/9\n"
+    b"/repositories/10/resources/1\n"
+)
+
+EXPECTED = {
+    "2025-01-02": {(2, 100), (4, 300)},
+    "2025-01-03": set(),
+    "2025-01-04": {(9, 9), (10, 1)},
+}
+
+
+class IterBatchesTest(unittest.TestCase):
+    def test_batches_join_blocks_on_line_boundaries(self):
+        batches = list(pre._iter_batches([b"a", b"bc", b"d", b"e"], size=3))
+        self.assertEqual(batches, [b"a\nbc", b"d\ne"])
+
+    def test_no_blocks_gives_no_batches(self):
+        self.assertEqual(list(pre._iter_batches([], size=3)), [])
+
+
+class ParseSectionsTest(unittest.TestCase):
+    def test_text_before_first_marker_has_no_date(self):
+        sections = pre._parse_sections(
+            b"/repositories/1/resources/2\n"
+            b"==DATE:2025-01-02==\n"
+            b"/repositories/3/resources/4"
+        )
+        self.assertEqual(sections, [(None, {(1, 2)}), ("2025-01-02", {(3, 4)})])
+
+    def test_marker_at_end_of_buffer(self):
+        sections = pre._parse_sections(b"==DATE:2025-01-02==")
+        self.assertEqual(sections, [(None, set()), ("2025-01-02", set())])
+
+
+class CollectResourcesTest(unittest.TestCase):
+    def collect(self, piece):
+        return pre._collect_resources(FakeChannel(OUTPUT, piece), list(EXPECTED))
+
+    def test_sections_survive_any_read_size(self):
+        for piece in (1, 5, 19, len(OUTPUT)):
+            with self.subTest(piece=piece):
+                self.assertEqual(self.collect(piece), EXPECTED)
+
+    def test_batches_split_inside_a_section_are_merged(self):
+        # A tiny batch size sends everything past the first block to the
+        # process pool, one short batch at a time
+        pool = mock.Mock(wraps=pre.concurrent.futures.ProcessPoolExecutor)
+        with mock.patch.object(pre, "_BATCH_SIZE", 10), \
+                mock.patch.object(pre.concurrent.futures, "ProcessPoolExecutor", pool):
+            self.assertEqual(self.collect(7), EXPECTED)
+        pool.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()